@@ -1,2 +1,2 @@
 from .wall_compound import Wall
-from .wall_layer import Layer
\ No newline at end of file
+from .wall_layer import Layer, layer_cache_info, clear_layer_cache
\ No newline at end of file
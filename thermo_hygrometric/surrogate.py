@@ -0,0 +1,211 @@
+from dataclasses import dataclass, replace
+from itertools import product
+import numpy as np
+from .wall_compound import Wall
+
+# outputs served by the surrogate, computed with the Wall methods
+OUTPUTS = {
+    "U": Wall.thermal_transmittance,
+    "Y12": Wall.calc_trasmittanza_termica_periodica,
+    "fd": Wall.calc_attenuazione,
+    "sfasamento": Wall.calc_sfasamento,
+}
+
+
+@dataclass
+class FreeParameter:
+    "A Layer attribute left free in the template, sampled on the given grid values"
+    layer_index: int
+    attribute: str  # e.g. "thickness", "thermal_conductivity", "density"
+    values: np.ndarray  # grid nodes, strictly increasing
+
+    def __post_init__(self):
+        self.values = np.asarray(self.values, dtype=float)
+        if self.values.ndim != 1 or len(self.values) < 2:
+            raise ValueError("values must be a 1D array with at least 2 nodes")
+        if np.any(np.diff(self.values) <= 0):
+            raise ValueError("values must be strictly increasing")
+
+
+def _wall_from_template(
+    template: Wall, parameters: list[FreeParameter], point
+) -> Wall:
+    "Copy of the template Wall with the free parameters set to point"
+    layers = list(template.layers)
+    for param, value in zip(parameters, point):
+        layers[param.layer_index] = replace(
+            layers[param.layer_index], **{param.attribute: float(value)}
+        )
+    return replace(template, layers=layers)
+
+
+def _evaluate(template: Wall, parameters: list[FreeParameter], points) -> dict:
+    "Exact outputs (from the Wall methods) for each point. Shape of points: (n, d)"
+    res = {key: np.empty(len(points)) for key in OUTPUTS}
+    for i, point in enumerate(points):
+        wall = _wall_from_template(template, parameters, point)
+        for key, method in OUTPUTS.items():
+            res[key][i] = method(wall)
+    return res
+
+
+# safety factor on the error bound, covering the variation of the second
+# derivatives inside a cell
+ERROR_SAFETY_FACTOR = 2.0
+
+
+def _abs_error(key: str, exact: np.ndarray, approx: np.ndarray, time: float):
+    "|approx - exact|; sfasamento is periodic so the difference is taken modulo time"
+    diff = approx - exact
+    if key == "sfasamento":
+        diff = (diff + time / 2) % time - time / 2
+    return np.abs(diff)
+
+
+@dataclass
+class WallSurrogate:
+    """
+    Lookup tables of U, Y12, fd and sfasamento over a grid of free parameters
+    of a Wall template, served by multilinear interpolation.
+
+    error_bounds contains, for each output, a bound on the interpolation error.
+    The error of multilinear interpolation is at most sum_k h_k^2/8 max|d2f/dx_k^2|;
+    along each axis h_k^2/8 |d2f/dx_k^2| is measured as the error at the midpoints
+    of the cells' edges, the sum of the maxima is multiplied by ERROR_SAFETY_FACTOR.
+    It is built on samples, so it's not a strict guarantee for functions with
+    sharp features between the nodes"""
+
+    parameters: list[FreeParameter]
+    tables: dict[str, np.ndarray]  # each of shape (len(p.values) for p in parameters)
+    error_bounds: dict[str, float]
+    time: float = 24  # period of the template Wall, sfasamento is modulo time
+
+    @classmethod
+    def build(
+        cls, template: Wall, parameters: list[FreeParameter]
+    ) -> "WallSurrogate":
+        "Sample the template Wall on the grid and bound the interpolation error"
+        shape = tuple(len(p.values) for p in parameters)
+        nodes = np.array(list(product(*(p.values for p in parameters))))
+        tables = {
+            key: values.reshape(shape)
+            for key, values in _evaluate(template, parameters, nodes).items()
+        }
+        # sfasamento comes from arctan2 and wraps around: unwrap it before interpolating
+        for axis in range(len(parameters)):
+            tables["sfasamento"] = np.unwrap(
+                tables["sfasamento"], axis=axis, period=template.time
+            )
+        surrogate = cls(
+            parameters=parameters, tables=tables, error_bounds={}, time=template.time
+        )
+
+        def max_errors(points) -> dict[str, float]:
+            exact = _evaluate(template, parameters, points)
+            approx = {key: np.empty(len(points)) for key in OUTPUTS}
+            for i, point in enumerate(points):
+                for key, value in surrogate._interpolate(point).items():
+                    approx[key][i] = value
+            return {
+                key: float(
+                    np.max(_abs_error(key, exact[key], approx[key], template.time))
+                )
+                for key in OUTPUTS
+            }
+
+        # edges' midpoints along each axis: h_k^2/8 |d2f/dx_k^2|
+        midpoints = [(p.values[1:] + p.values[:-1]) / 2 for p in parameters]
+        bounds = dict.fromkeys(OUTPUTS, 0.0)
+        for axis in range(len(parameters)):
+            edges = np.array(
+                list(
+                    product(
+                        *(
+                            midpoints[k] if k == axis else p.values
+                            for k, p in enumerate(parameters)
+                        )
+                    )
+                )
+            )
+            for key, err in max_errors(edges).items():
+                bounds[key] += err
+        # cells' centres, in case the cross terms dominate
+        for key, err in max_errors(np.array(list(product(*midpoints)))).items():
+            bounds[key] = ERROR_SAFETY_FACTOR * max(bounds[key], err)
+
+        surrogate.error_bounds = bounds
+        return surrogate
+
+    def _interpolate(self, point) -> dict[str, float]:
+        indices = []
+        weights = []
+        for param, x in zip(self.parameters, point):
+            if not param.values[0] <= x <= param.values[-1]:
+                raise ValueError(
+                    f"{param.attribute} of layer {param.layer_index} = {x} "
+                    f"is outside the grid [{param.values[0]}, {param.values[-1]}]"
+                )
+            i = np.clip(np.searchsorted(param.values, x) - 1, 0, len(param.values) - 2)
+            indices.append(i)
+            weights.append((x - param.values[i]) / (param.values[i + 1] - param.values[i]))
+
+        res = dict.fromkeys(self.tables, 0.0)
+        for corner in product((0, 1), repeat=len(self.parameters)):
+            w = 1.0
+            for c, t in zip(corner, weights):
+                w *= t if c else 1 - t
+            if w == 0.0:
+                continue
+            index = tuple(i + c for i, c in zip(indices, corner))
+            for key, table in self.tables.items():
+                res[key] += w * table[index]
+        return res
+
+    def predict(self, *point: float) -> dict[str, tuple[float, float]]:
+        "Interpolated outputs as {name: (value, error bound)}. One value per free parameter"
+        if len(point) != len(self.parameters):
+            raise ValueError(
+                f"expected {len(self.parameters)} values, got {len(point)}"
+            )
+        res = self._interpolate(point)
+        res["sfasamento"] %= self.time
+        return {key: (float(value), self.error_bounds[key]) for key, value in res.items()}
+
+    def save(self, path: str) -> None:
+        "Save the tables to a .npz file"
+        arrays = {
+            "layer_indices": np.array([p.layer_index for p in self.parameters]),
+            "attributes": np.array([p.attribute for p in self.parameters]),
+            "outputs": np.array(list(self.tables)),
+            "error_bounds": np.array([self.error_bounds[key] for key in self.tables]),
+            "time": np.array(self.time),
+        }
+        for n, param in enumerate(self.parameters):
+            arrays[f"values_{n}"] = param.values
+        for key, table in self.tables.items():
+            arrays[f"table_{key}"] = table
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "WallSurrogate":
+        "Load the tables saved with save()"
+        with np.load(path) as data:
+            parameters = [
+                FreeParameter(
+                    layer_index=int(layer_index),
+                    attribute=str(attribute),
+                    values=data[f"values_{n}"],
+                )
+                for n, (layer_index, attribute) in enumerate(
+                    zip(data["layer_indices"], data["attributes"])
+                )
+            ]
+            outputs = [str(key) for key in data["outputs"]]
+            tables = {key: data[f"table_{key}"] for key in outputs}
+            error_bounds = {
+                key: float(err) for key, err in zip(outputs, data["error_bounds"])
+            }
+            time = float(data["time"])
+        return cls(
+            parameters=parameters, tables=tables, error_bounds=error_bounds, time=time
+        )
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import numpy as np
+from .global_variables import EXPORT_FOLDER
+from .wall_compound import Wall, _k1_int, _phase, _y12
+from .wall_layer import Layer
+
+PROGRESS_FILE = "progress.json"
+
+
+# outputs written by the sweep, one .npy file each
+OUTPUTS = ("U", "Y12", "sfasamento", "fd", "k1", "glaser_min_margin", "glaser_max_margin")
+
+
+def _wall_outputs(wall: Wall) -> tuple[float, ...]:
+    "OUTPUTS of a Wall, in order. Zee and the Glaser diagram are computed once"
+    U = wall.thermal_transmittance()
+    Zee = wall.calc_matrice_trasferimento_tot_ambiente_ambiente()
+    Y12 = _y12(Zee)
+
+    # saturation pressure - vapour pressure at each interface. Negative means condensation
+    margins = (
+        wall.calc_saturation_pressures(check=False)[1:-1]
+        - wall.calc_internal_pressures(check=False)
+    )
+    return (
+        U,
+        Y12,
+        _phase(Zee, wall.time) + wall.time / 2,  # sfasamento
+        -Y12 / U,  # fd
+        _k1_int(Zee, wall.time),
+        np.min(margins),
+        np.max(margins),
+    )
+
+
+def _fingerprint(layer_options: list[list[Layer]], wall_kwargs: dict) -> str:
+    "hash of everything the results depend on: the layers' parameters and wall_kwargs"
+    h = hashlib.sha256()
+    for options in layer_options:
+        for layer in options:
+            h.update(
+                np.array(
+                    [
+                        layer.thickness,
+                        layer.thermal_conductivity,
+                        layer.vapor_permeability,
+                        layer.density,
+                        layer.specific_heat,
+                    ],
+                    dtype=float,
+                ).tobytes()
+            )
+        h.update(b"|")  # end of a position
+    for key, value in sorted(wall_kwargs.items()):
+        value = np.asarray(value, dtype=float)  # 10 and 10.0 are the same study
+        h.update(f"{key}:{value.dtype.str}:{value.shape}:".encode())
+        h.update(value.tobytes())
+    return h.hexdigest()
+
+
+def sweep_combination(layer_options: list[list[Layer]], index: int) -> list[Layer]:
+    "Layers of the combination stored at index in the sweep's arrays (C order)"
+    choices = np.unravel_index(index, [len(options) for options in layer_options])
+    return [options[c] for options, c in zip(layer_options, choices)]
+
+
+def _open_arrays(folder: str, n: int, dtype, mode: str) -> dict[str, np.memmap]:
+    return {
+        key: np.lib.format.open_memmap(
+            os.path.join(folder, f"{key}.npy"), mode=mode, dtype=dtype, shape=(n,)
+        )
+        if mode == "w+"
+        else np.load(os.path.join(folder, f"{key}.npy"), mmap_mode=mode)
+        for key in OUTPUTS
+    }
+
+
+def run_sweep(
+    layer_options: list[list[Layer]],
+    folder: str = EXPORT_FOLDER,
+    chunk_size: int = 100_000,
+    dtype=np.float64,
+    **wall_kwargs,
+) -> dict[str, np.memmap]:
+    """
+    Evaluate every Wall made choosing one Layer per position from layer_options
+    and write each output to a memory-mapped .npy file in folder.
+
+    Arrays are filled chunk by chunk; after each chunk the progress is saved,
+    so calling again with the same arguments resumes an interrupted sweep.
+    wall_kwargs are passed to Wall (e.g. temp_ext, relative_humidity_ext) and
+    must be scalars: every combination is a single state"""
+    # fail now rather than with a shape error in the middle of the sweep
+    Wall(name="probe", layers=[], **wall_kwargs)._check_scalar(
+        Wall.BOUNDARY_CONDITIONS, "run_sweep"
+    )
+    shape = [len(options) for options in layer_options]
+    n = int(np.prod(shape))
+    dtype = np.dtype(dtype)
+    progress_path = os.path.join(folder, PROGRESS_FILE)
+    fingerprint = _fingerprint(layer_options, wall_kwargs)
+    progress = {"shape": shape, "dtype": dtype.str, "fingerprint": fingerprint, "done": 0}
+
+    if os.path.exists(progress_path):
+        with open(progress_path) as f:
+            saved = json.load(f)
+        if saved["shape"] != shape or saved["dtype"] != dtype.str:
+            raise ValueError(
+                f"{folder} contains a different sweep: shape {saved['shape']}, "
+                f"dtype {saved['dtype']}"
+            )
+        if saved.get("fingerprint") != fingerprint:
+            raise ValueError(
+                f"{folder} contains a sweep of different layers or wall_kwargs"
+            )
+        progress = saved
+        arrays = _open_arrays(folder, n, dtype, mode="r+")
+    else:
+        os.makedirs(folder, exist_ok=True)
+        arrays = _open_arrays(folder, n, dtype, mode="w+")
+
+    for start in range(progress["done"], n, chunk_size):
+        stop = min(start + chunk_size, n)
+        chunk = np.empty((stop - start, len(OUTPUTS)))
+        for i in range(start, stop):
+            wall = Wall(
+                name=str(i),
+                layers=sweep_combination(layer_options, i),
+                **wall_kwargs,
+            )
+            chunk[i - start] = _wall_outputs(wall)
+        for column, key in enumerate(OUTPUTS):
+            arrays[key][start:stop] = chunk[:, column]
+            arrays[key].flush()
+
+        # write the progress only once the chunk is on disk
+        progress["done"] = stop
+        with open(progress_path + ".tmp", "w") as f:
+            json.dump(progress, f)
+        os.replace(progress_path + ".tmp", progress_path)
+
+    return arrays
+
+
+def load_sweep(folder: str = EXPORT_FOLDER) -> dict[str, np.memmap]:
+    "Read-only memory maps of the outputs written by run_sweep"
+    with open(os.path.join(folder, PROGRESS_FILE)) as f:
+        progress = json.load(f)
+    n = int(np.prod(progress["shape"]))
+    if progress["done"] < n:
+        raise ValueError(f"sweep in {folder} is incomplete: {progress['done']}/{n}")
+    return _open_arrays(folder, n, np.dtype(progress["dtype"]), mode="r")
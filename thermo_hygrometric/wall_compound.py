@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Union
 import numpy as np
 from numpy.testing import assert_almost_equal
 from .wall_layer import Layer
@@ -6,19 +7,67 @@ import matplotlib.pyplot as plt
 import pandas as pd
 
 
+# ======== QUANTITIES FROM THE TRANSFER MATRIX ========
+# shared by the Wall methods and by the sweeps, which compute Zee only once
+
+
+def _y12(Zee: np.ndarray) -> float:
+    "Y12 = modulo(-1/Z12)"
+    Y12 = -1 / Zee[0][1]
+    return np.sqrt((Y12.real) ** 2 + (Y12.imag) ** 2)
+
+
+def _phase(Zee: np.ndarray, time: float) -> float:
+    "phase of Z12, in hours for a period of time hours"
+    return (np.arctan2(Zee[0][1].imag, Zee[0][1].real)) * time / (2 * np.pi)
+
+
+def _k1_int(Zee: np.ndarray, time: float) -> float:
+    "k1 = omega * modulo(Z11-1/Z12), in kJ/m2 K"
+    return (
+        (time * 3600)
+        / (2 * np.pi)
+        * np.sqrt(
+            (((Zee[0][0] - 1) / Zee[0][1]).real) ** 2
+            + (((Zee[0][0] - 1) / Zee[0][1]).imag) ** 2
+        )
+    ) / 1000
+
+
 @dataclass
 class Wall:
     name: str
     layers: list[Layer]
-    # int = internal, ext = external :
-    temp_int: float = 20.0  # Temperature in celsius
-    temp_ext: float = -5.0
-    relative_humidity_int: float = 0.65  # URi
-    relative_humidity_ext: float = 0.9  # URe
-    surface_thermal_resistance_int: float = 0.130  # Rsi
-    surface_thermal_resistance_ext: float = 0.040  # Rse
+    # int = internal, ext = external.
+    # Boundary conditions can be np.arrays (one value per state, e.g. per hour or climate):
+    # they are broadcast together and static results get shape (n_states, n_nodes).
+    # The dynamic analysis needs scalar surface thermal resistances
+    temp_int: Union[float, np.ndarray] = 20.0  # Temperature in celsius
+    temp_ext: Union[float, np.ndarray] = -5.0
+    relative_humidity_int: Union[float, np.ndarray] = 0.65  # URi
+    relative_humidity_ext: Union[float, np.ndarray] = 0.9  # URe
+    surface_thermal_resistance_int: Union[float, np.ndarray] = 0.130  # Rsi
+    surface_thermal_resistance_ext: Union[float, np.ndarray] = 0.040  # Rse
     time: float = 24  # time of the analysis in hour
 
+    BOUNDARY_CONDITIONS = (
+        "temp_int",
+        "temp_ext",
+        "relative_humidity_int",
+        "relative_humidity_ext",
+        "surface_thermal_resistance_int",
+        "surface_thermal_resistance_ext",
+    )
+
+    def _check_scalar(self, fields: tuple[str, ...], use: str) -> None:
+        "raise a ValueError if some of the fields are array-valued"
+        arrays = [field for field in fields if np.ndim(getattr(self, field)) > 0]
+        if arrays:
+            raise ValueError(
+                f"{use} needs scalar {', '.join(arrays)}: "
+                "array-valued boundary conditions are supported only in the static analysis"
+            )
+
     def thicknesses(self) -> np.ndarray:
         "np.array with thickness of each Layer"
         return np.array([layer.thickness for layer in self.layers])
@@ -67,72 +116,96 @@ class Wall:
 
     def thermal_resistances(self) -> np.ndarray:
         "np.array with the thermal resistance of each Layer, with addition of the internal and external surface thermal resistance"
+        rsi = np.asarray(self.surface_thermal_resistance_int, dtype=float)[..., None]
+        rse = np.asarray(self.surface_thermal_resistance_ext, dtype=float)[..., None]
+        shape = np.broadcast_shapes(rsi.shape[:-1], rse.shape[:-1])
+
         res = np.array([layer.thermal_resistance for layer in self.layers])
-        res = np.insert(res, 0, self.surface_thermal_resistance_int)
-        res = np.append(res, self.surface_thermal_resistance_ext)
+        res = np.concatenate(
+            [
+                np.broadcast_to(rsi, shape + (1,)),
+                np.broadcast_to(res, shape + res.shape),
+                np.broadcast_to(rse, shape + (1,)),
+            ],
+            axis=-1,
+        )
 
         return res
 
-    def thermal_resistance_tot(self) -> float:
+    def thermal_resistance_tot(self) -> Union[float, np.ndarray]:
         "sum of the thermal resistances. Starting from the surface internal' one"
-        return np.sum(self.thermal_resistances())
+        return np.sum(self.thermal_resistances(), axis=-1)
 
     def thermal_resistance_cumsum(self) -> np.ndarray:
         "cumulative sum of the thermal resistances"
-        cum_sum = np.cumsum(self.thermal_resistances(), dtype=float)
+        cum_sum = np.cumsum(self.thermal_resistances(), axis=-1, dtype=float)
         return cum_sum
 
-    def thermal_transmittance(self) -> float:
+    def thermal_transmittance(self) -> Union[float, np.ndarray]:
         "U = 1/R_tot"
         return 1 / self.thermal_resistance_tot()
 
-    def calc_surface_temperatures(self) -> np.ndarray:
-        delta_temp = self.temp_int - self.temp_ext
-        temp = self.temp_int - (
-            (self.thermal_resistance_cumsum() * delta_temp)
-            / self.thermal_resistance_tot()
+    def calc_surface_temperatures(self, check: bool = True) -> np.ndarray:
+        "Temperatures at the nodes. check=False skips the consistency check on the last node"
+        temp_int = np.asarray(self.temp_int, dtype=float)[..., None]
+        temp_ext = np.asarray(self.temp_ext, dtype=float)[..., None]
+        delta_temp = temp_int - temp_ext
+        res_cumsum = self.thermal_resistance_cumsum()
+        res_tot = res_cumsum[..., -1:]
+        temp = temp_int - ((res_cumsum * delta_temp) / res_tot)
+        temp = np.concatenate(
+            [np.broadcast_to(temp_int, temp.shape[:-1] + (1,)), temp], axis=-1
         )
-        temp = np.insert(temp, 0, self.temp_int)
 
         # last term of temp array should be equal to temp_ext
-        assert_almost_equal(temp[-1], self.temp_ext)
+        if check:
+            assert_almost_equal(
+                temp[..., -1], np.broadcast_to(temp_ext[..., 0], temp.shape[:-1])
+            )
 
         return temp
 
-    def calc_saturation_pressures(self) -> np.ndarray:
-        return np.array(
-            [
-                610.5 * np.exp(17.269 * temp / (237.3 + temp))
-                if temp >= 0
-                else 610.5 * np.exp(21.875 * temp / (265.5 + temp))
-                for temp in self.calc_surface_temperatures()
-            ]
+    def calc_saturation_pressures(self, check: bool = True) -> np.ndarray:
+        temp = self.calc_surface_temperatures(check=check)
+        return np.where(
+            temp >= 0,
+            610.5 * np.exp(17.269 * temp / (237.3 + temp)),
+            610.5 * np.exp(21.875 * temp / (265.5 + temp)),
         )
 
-    def calc_internal_pressures(self) -> np.ndarray:
-        p_int = self.relative_humidity_int * self.calc_saturation_pressures()[0]
-        p_ext = self.relative_humidity_ext * self.calc_saturation_pressures()[-1]
+    def calc_internal_pressures(self, check: bool = True) -> np.ndarray:
+        "Vapour pressures at the interfaces. check=False skips the consistency checks"
+        saturation_pressures = self.calc_saturation_pressures(check=check)
+        p_int = (
+            np.asarray(self.relative_humidity_int, dtype=float)
+            * saturation_pressures[..., 0]
+        )[..., None]
+        p_ext = (
+            np.asarray(self.relative_humidity_ext, dtype=float)
+            * saturation_pressures[..., -1]
+        )[..., None]
         delta_p = p_int - p_ext
 
-        # 1:lenght-2 because we already know pressure at the boundaries
+        # from 1 because we already know pressure at the internal boundary
         press = p_int - (
-            (
-                self.equivalent_thickness_cumsum()[
-                    1 : len(self.calc_saturation_pressures() - 2)
-                ]
-                * delta_p
-            )
+            (self.equivalent_thickness_cumsum()[1:] * delta_p)
             / self.equivalent_thickness_tot()
         )
-        press = np.insert(press, 0, p_int)
+        press = np.concatenate(
+            [np.broadcast_to(p_int, press.shape[:-1] + (1,)), press], axis=-1
+        )
 
         # last term of press array should be equal to p_ext
-        assert_almost_equal(press[-1], p_ext)
+        if check:
+            assert_almost_equal(
+                press[..., -1], np.broadcast_to(p_ext[..., 0], press.shape[:-1])
+            )
 
         return press
 
     def plot_glaser(self, show_layer_color: bool = True, show_layer_name: bool = True):
         "Plot the Glaser diagram for the considered compound structure"
+        self._check_scalar(self.BOUNDARY_CONDITIONS, "plot_glaser")
 
         COLORS = [
             list(plt.rcParams["axes.prop_cycle"])[col]["color"]
@@ -298,40 +371,16 @@ class Wall:
     # TODO cambiare i nomi che sono in italiano
     def calc_profondità_penetrazione(self) -> np.ndarray:
         "delta"
-        # TIME: hour to seconds
-        return np.sqrt(
-            (self.thermal_conductivities() * self.time * 3600)
-            / (np.pi * self.densities() * self.specific_heats())
+        return np.array(
+            [layer.terms(self.time).penetration_depth for layer in self.layers]
         )
 
     def xi(self) -> np.ndarray:
         return self.thicknesses() / self.calc_profondità_penetrazione()
 
     def calc_matrice_trasferimento_layer(self) -> list[np.ndarray]:
-        # TODO cambiare nome a delta e xi
-        xi = self.xi()
-        delta = self.calc_profondità_penetrazione()
-        thermal_conductivity = self.thermal_conductivities()
-
-        zz: list[np.ndarray] = []  # zz : lista di matrici z
-        for i in range(0, len(xi)):
-            # z : matrice per ogni strato
-            z = np.zeros((2, 2), dtype=np.complex128)  # matrice complex float
-            z[0][0] = complex(
-                (np.cosh(xi[i]) * np.cos(xi[i])), (np.sinh(xi[i]) * np.sin(xi[i]))
-            )
-            z[1][1] = z[0][0]
-            z[0][1] = -(delta[i] / (2 * thermal_conductivity[i])) * complex(
-                (np.sinh(xi[i]) * np.cos(xi[i]) + np.cosh(xi[i]) * np.sin(xi[i])),
-                (np.cosh(xi[i]) * np.sin(xi[i]) - np.sinh(xi[i]) * np.cos(xi[i])),
-            )
-            z[1][0] = -(thermal_conductivity[i] / (delta[i])) * complex(
-                (np.sinh(xi[i]) * np.cos(xi[i]) - np.cosh(xi[i]) * np.sin(xi[i])),
-                (np.sinh(xi[i]) * np.cos(xi[i]) + np.cosh(xi[i]) * np.sin(xi[i])),
-            )
-            # aggiunge alla lista zz
-            zz.append(z)
-        return zz
+        "zz : lista di matrici z, una per strato. Read only, shared through the layer cache"
+        return [layer.terms(self.time).transfer_matrix for layer in self.layers]
 
     def calc_matrice_trasferimento_tot(self) -> np.ndarray:
         "Z = matrice di trasferimento totale  del componente edilizio = Z_N * Z_n-1 * ... * Z_1"
@@ -345,6 +394,10 @@ class Wall:
 
     def calc_matrice_trasferimento_tot_ambiente_ambiente(self) -> np.ndarray:
         "Zee"
+        self._check_scalar(
+            ("surface_thermal_resistance_int", "surface_thermal_resistance_ext"),
+            "The dynamic analysis",
+        )
         Z = self.calc_matrice_trasferimento_tot()
 
         # Strato d'aria interno
@@ -374,10 +427,7 @@ class Wall:
 
     def calc_trasmittanza_termica_periodica(self) -> float:
         "Y12"
-        Y12 = -1 / self.calc_matrice_trasferimento_tot_ambiente_ambiente()[0][1]
-        Y12 = np.sqrt((Y12.real) ** 2 + (Y12.imag) ** 2)
-
-        return Y12
+        return _y12(self.calc_matrice_trasferimento_tot_ambiente_ambiente())
 
     def calc_attenuazione(self) -> float:
         "fd"
@@ -386,11 +436,8 @@ class Wall:
         )
 
     def calc_phase(self) -> float:
-        Zee = self.calc_matrice_trasferimento_tot_ambiente_ambiente()
         # time in hour
-        return (
-            (np.arctan2(Zee[0][1].imag, Zee[0][1].real)) * self.time / (2 * np.pi)
-        )  # tempo in ore
+        return _phase(self.calc_matrice_trasferimento_tot_ambiente_ambiente(), self.time)
 
     def calc_sfasamento(self) -> float:
         return self.calc_phase() + self.time / 2
@@ -415,15 +462,9 @@ class Wall:
 
     def calc_capacita_termica_areica_interna(self) -> float:
         "k1 = omega * modulo(Z11-1/Z12)"
-        Zee = self.calc_matrice_trasferimento_tot_ambiente_ambiente()
-        return (
-            (self.time * 3600)
-            / (2 * np.pi)
-            * np.sqrt(
-                (((Zee[0][0] - 1) / Zee[0][1]).real) ** 2
-                + (((Zee[0][0] - 1) / Zee[0][1]).imag) ** 2
-            )
-        ) / 1000  # kJ/m2 K
+        return _k1_int(
+            self.calc_matrice_trasferimento_tot_ambiente_ambiente(), self.time
+        )
 
     def calc_capacita_termica_areica_esterna(self) -> float:
         "k1 = omega * modulo(Z11-1/Z12)"
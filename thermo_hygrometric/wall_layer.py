@@ -1,5 +1,61 @@
 from dataclasses import dataclass
-from typing import Optional
+from functools import lru_cache
+from typing import NamedTuple, Optional
+import numpy as np
+
+LAYER_CACHE_SIZE = 4096  # max number of distinct layers kept in the cache
+
+
+class LayerTerms(NamedTuple):
+    penetration_depth: float  # delta
+    transfer_matrix: np.ndarray  # 2x2 complex, read only
+
+
+@lru_cache(maxsize=LAYER_CACHE_SIZE)
+def calc_layer_terms(
+    thickness: float,
+    thermal_conductivity: float,
+    density: float,
+    specific_heat: float,
+    time: float,
+) -> LayerTerms:
+    """
+    Penetration depth and transfer matrix of a single layer for a period of time hours.
+
+    Cached: walls sharing the same layers compute them only once"""
+    # np.float64 as in the vectorised formulas: e.g. density = 0 gives nan, not ZeroDivisionError
+    thickness, thermal_conductivity, density, specific_heat = map(
+        np.float64, (thickness, thermal_conductivity, density, specific_heat)
+    )
+    # TIME: hour to seconds
+    delta = np.sqrt(
+        (thermal_conductivity * time * 3600) / (np.pi * density * specific_heat)
+    )
+    xi = thickness / delta
+
+    z = np.zeros((2, 2), dtype=np.complex128)  # matrice complex float
+    z[0][0] = complex((np.cosh(xi) * np.cos(xi)), (np.sinh(xi) * np.sin(xi)))
+    z[1][1] = z[0][0]
+    z[0][1] = -(delta / (2 * thermal_conductivity)) * complex(
+        (np.sinh(xi) * np.cos(xi) + np.cosh(xi) * np.sin(xi)),
+        (np.cosh(xi) * np.sin(xi) - np.sinh(xi) * np.cos(xi)),
+    )
+    z[1][0] = -(thermal_conductivity / delta) * complex(
+        (np.sinh(xi) * np.cos(xi) - np.cosh(xi) * np.sin(xi)),
+        (np.sinh(xi) * np.cos(xi) + np.cosh(xi) * np.sin(xi)),
+    )
+    z.flags.writeable = False  # shared between walls
+
+    return LayerTerms(penetration_depth=delta, transfer_matrix=z)
+
+
+def layer_cache_info():
+    "hits, misses, maxsize and currsize of the per-layer cache"
+    return calc_layer_terms.cache_info()
+
+
+def clear_layer_cache() -> None:
+    calc_layer_terms.cache_clear()
 
 
 @dataclass
@@ -23,3 +79,13 @@ class Layer:
     def thermal_resistance(self):
         "R"
         return self.thickness / self.thermal_conductivity
+
+    def terms(self, time: float = 24) -> LayerTerms:
+        "delta and transfer matrix, from the shared cache"
+        return calc_layer_terms(
+            self.thickness,
+            self.thermal_conductivity,
+            self.density,
+            self.specific_heat,
+            time,
+        )